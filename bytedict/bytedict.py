@@ -1,5 +1,36 @@
-import hashlib
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256 as _sha256
+
+import numpy as np
+import numpy.typing as npt
+
+try:
+    from blake3 import blake3 as _blake3
+except ImportError:  # blake3 is an optional dependency
+    _blake3 = None
+
+_HASHERS = {"sha256": _sha256}
+if _blake3 is not None:
+    _HASHERS["blake3"] = _blake3
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?]) +")
+_SUBPHRASE_RE = re.compile(r"[,;]")
+
+# Bit flags recording which kinds of token an interned hash was added as
+_KIND_CHAR = 1
+_KIND_WORD = 2
+_KIND_PHRASE = 4
+_KIND_EMBEDDING = 8
+
+# Rows allocated for the embedding matrix when the first embedding is added
+_INITIAL_EMBEDDING_ROWS = 1024
+
+# Element types the embedding matrix can be stored in; int8 rows are scaled
+# per row so that their largest magnitude maps to 127
+_EMBEDDING_DTYPES = (np.dtype(np.float32), np.dtype(np.float16), np.dtype(np.int8))
 
 
 def ensure_str(value: str | bytes) -> str:
@@ -21,67 +52,216 @@ def ensure_bytes(value: str | bytes) -> bytes:
 
 
 class GlobalDictionary:
-    def __init__(self) -> None:
-        self.char_store: dict[bytes, str] = {}
-        self.word_store: dict[bytes, str] = {}
-        self.phrase_store: dict[bytes, str] = {}
-        self.embedding_store: dict[bytes, list[float]] = {}
+    def __init__(
+        self,
+        hash_algorithm: str = "sha256",
+        embedding_dtype: npt.DTypeLike = np.float32,
+    ) -> None:
+        if hash_algorithm == "blake3" and _blake3 is None:
+            raise ImportError(
+                'hash_algorithm="blake3" requires the optional blake3 package.'
+            )
+        if hash_algorithm not in _HASHERS:
+            raise ValueError(f"Unsupported hash algorithm: {hash_algorithm!r}.")
+        unsupported_dtype = f"Unsupported embedding dtype: {embedding_dtype!r}."
+        try:
+            dtype = np.dtype(embedding_dtype)
+        except TypeError:
+            raise ValueError(unsupported_dtype) from None
+        if dtype not in _EMBEDDING_DTYPES:
+            raise ValueError(unsupported_dtype)
+        self._new_hash = _HASHERS[hash_algorithm]
+        self._embedding_dtype = dtype
+        # Largest magnitude an embedding value may have; int8 rows keep their
+        # per-row scale in float32
+        self._embedding_max = float(
+            np.finfo(
+                np.float16 if self._embedding_dtype == np.float16 else np.float32
+            ).max
+        )
+        # Every hash is interned once to an index into the parallel arrays
+        # below, whether it was added as a character, word, phrase or only
+        # given an embedding. Texts are kept in one column per kind, since the
+        # same digest can be added as a word and as a phrase with different
+        # texts. Embeddings are rows of a single matrix that is allocated on
+        # first use and grown as indices exceed its capacity.
+        self._index: dict[bytes, int] = {}
+        # Serializes writes to the index and parallel arrays, and all access
+        # to the embedding matrix
+        self._lock = threading.Lock()
+        self._texts: dict[int, list[str | None]] = {
+            _KIND_CHAR: [],
+            _KIND_WORD: [],
+            _KIND_PHRASE: [],
+        }
+        self._kinds = bytearray()
+        self._embeddings: np.ndarray | None = None
+        self._embedding_scales: np.ndarray | None = None
+        self._char_hash_cache: dict[str, bytes] = {}
+        self._word_hash_cache: dict[str, bytes] = {}
+        self._phrase_hash_cache: dict[str, bytes] = {}
 
     def get_hash(self, text: str | bytes) -> bytes:
-        """Generate a SHA-256 hash for the given text and return its bytes representation."""
-        text = ensure_bytes(text)
-        hash_object = hashlib.sha256(text).digest()
-        return hash_object
+        """Generate a hash for the given text and return its bytes representation."""
+        return self._new_hash(ensure_bytes(text)).digest()
 
     def add_char(self, char: str | bytes) -> bytes:
         """Add a character to the dictionary and return its hash."""
-        hash_value = self.get_hash(char)
-        char = ensure_str(char)
-        if hash_value not in self.char_store:
-            self.char_store[hash_value] = char
-        return hash_value
+        return self._intern_char(ensure_str(char))
 
     def add_word(self, word: str | bytes) -> bytes:
         """Add a word to the dictionary and return its hash."""
-        word = ensure_str(word)
-        char_hashes = [self.add_char(c) for c in word]
-        combined_hash = self.get_hash(b"".join(char_hashes))
-        if combined_hash not in self.word_store:
-            self.word_store[combined_hash] = word
-        return combined_hash
+        return self._intern_word(ensure_str(word))
 
     def add_phrase(self, phrase: str | bytes) -> bytes:
         """Add a phrase or sentence to the dictionary and return its hash."""
-        phrase = ensure_str(phrase)
-        tokens = re.findall(r"\w+|[^\w\s]", phrase)
-        token_hashes = [
-            self.add_word(token) if token.isalnum() else self.add_char(token)
-            for token in tokens
-        ]
-        combined_hash = self.get_hash(b"".join(token_hashes))
-        if combined_hash not in self.phrase_store:
-            self.phrase_store[combined_hash] = phrase
+        return self._intern_phrase(ensure_str(phrase))
+
+    def _intern_char(self, char: str) -> bytes:
+        """Add an already-decoded character and return its hash."""
+        hash_value = self._char_hash_cache.get(char)
+        if hash_value is None:
+            hash_value = self._new_hash(char.encode("utf-8")).digest()
+            self._add(hash_value, char, _KIND_CHAR)
+            self._char_hash_cache[char] = hash_value
+        return hash_value
+
+    def _intern_word(self, word: str) -> bytes:
+        """Add an already-decoded word and return its hash."""
+        combined_hash = self._word_hash_cache.get(word)
+        if combined_hash is None:
+            hasher = self._new_hash()
+            for c in word:
+                hasher.update(self._intern_char(c))
+            combined_hash = hasher.digest()
+            self._add(combined_hash, word, _KIND_WORD)
+            self._word_hash_cache[word] = combined_hash
         return combined_hash
 
+    def _intern_phrase(self, phrase: str) -> bytes:
+        """Add an already-decoded phrase or sentence and return its hash."""
+        combined_hash = self._phrase_hash_cache.get(phrase)
+        if combined_hash is None:
+            tokens = _TOKEN_RE.findall(phrase)
+            hasher = self._new_hash()
+            for token in tokens:
+                hasher.update(
+                    self._intern_word(token)
+                    if token.isalnum()
+                    else self._intern_char(token)
+                )
+            combined_hash = hasher.digest()
+            self._add(combined_hash, phrase, _KIND_PHRASE)
+            self._phrase_hash_cache[phrase] = combined_hash
+        return combined_hash
+
+    def _add(self, hash_value: bytes, text: str | None, kind: int) -> int:
+        """Record the text and kind for a hash and return its index."""
+        # Allocating an index and appending to the parallel arrays must not
+        # interleave when tokenizer threads add tokens concurrently.
+        with self._lock:
+            return self._add_locked(hash_value, text, kind)
+
+    def _add_locked(self, hash_value: bytes, text: str | None, kind: int) -> int:
+        """Same as _add, for callers already holding the lock."""
+        # New rows are appended before the index is published, and the text is
+        # written before its kind bit is set, so _get_text can read without the
+        # lock and see either nothing or a complete entry.
+        index = self._index.get(hash_value)
+        if index is None:
+            index = len(self._kinds)
+            for texts in self._texts.values():
+                texts.append(None)
+            self._kinds.append(0)
+            self._index[hash_value] = index
+        if kind in self._texts and self._texts[kind][index] is None:
+            self._texts[kind][index] = text
+        self._kinds[index] |= kind
+        return index
+
+    def _get_text(self, hash_value: bytes, kind: int) -> str:
+        """Retrieve the text for a hash if it was added as the given kind."""
+        index = self._index.get(hash_value)
+        if index is None or not self._kinds[index] & kind:
+            return "Not found"
+        return self._texts[kind][index]
+
     def get_char(self, hash_value: bytes) -> str:
         """Retrieve the character for a given hash."""
-        return self.char_store.get(hash_value, "Not found")
+        return self._get_text(hash_value, _KIND_CHAR)
 
     def get_word(self, hash_value: bytes) -> str:
         """Retrieve the word for a given hash."""
-        return self.word_store.get(hash_value, "Not found")
+        return self._get_text(hash_value, _KIND_WORD)
 
     def get_phrase(self, hash_value: bytes) -> str:
         """Retrieve the phrase for a given hash."""
-        return self.phrase_store.get(hash_value, "Not found")
+        return self._get_text(hash_value, _KIND_PHRASE)
 
-    def add_embedding(self, hash_value: bytes, embedding: list[float]) -> None:
+    def add_embedding(
+        self, hash_value: bytes, embedding: list[float] | np.ndarray
+    ) -> None:
         """Add an embedding for a given hash."""
-        self.embedding_store[hash_value] = embedding
+        vector = np.asarray(embedding, dtype=np.float64)
+        if vector.ndim != 1:
+            raise ValueError("Embedding must be one-dimensional.")
+        if not np.isfinite(vector).all():
+            raise ValueError("Embedding values must be finite.")
+        if np.abs(vector).max(initial=0.0) > self._embedding_max:
+            raise ValueError(
+                f"Embedding values must not exceed {self._embedding_max:g} in "
+                f"magnitude for {self._embedding_dtype} storage."
+            )
+        scale = None
+        if self._embedding_dtype == np.int8:
+            peak = float(np.abs(vector).max(initial=0.0))
+            scale = peak / 127 if peak else 1.0
+            vector = np.rint(vector / scale)
+        with self._lock:
+            if (
+                self._embeddings is not None
+                and len(vector) != self._embeddings.shape[1]
+            ):
+                raise ValueError(
+                    f"Embedding must have {self._embeddings.shape[1]} dimensions."
+                )
+            index = self._add_locked(hash_value, None, _KIND_EMBEDDING)
+            if self._embeddings is None or index >= len(self._embeddings):
+                self._grow_embeddings(index + 1, len(vector))
+            if scale is not None:
+                self._embedding_scales[index] = scale
+            self._embeddings[index] = vector
+
+    def get_embedding(self, hash_value: bytes) -> np.ndarray:
+        """
+        Retrieve a copy of the embedding for a given hash.
+        Use add_embedding to change a stored embedding.
+        """
+        with self._lock:
+            index = self._index.get(hash_value)
+            if index is None or not self._kinds[index] & _KIND_EMBEDDING:
+                return np.empty(0, dtype=np.float32)
+            if self._embedding_scales is not None:
+                # Dequantize int8 rows back to float32
+                return self._embeddings[index] * self._embedding_scales[index]
+            return self._embeddings[index].copy()
 
-    def get_embedding(self, hash_value: bytes) -> list[float]:
-        """Retrieve the embedding for a given hash."""
-        return self.embedding_store.get(hash_value, [])
+    def _grow_embeddings(self, rows: int, dim: int) -> None:
+        """Reallocate the embedding matrix; callers must hold the lock."""
+        if self._embeddings is None:
+            rows = max(rows, _INITIAL_EMBEDDING_ROWS)
+        else:
+            rows = max(rows, 2 * len(self._embeddings))
+        embeddings = np.empty((rows, dim), dtype=self._embedding_dtype)
+        scales = None
+        if self._embedding_dtype == np.int8:
+            scales = np.empty(rows, dtype=np.float32)
+        if self._embeddings is not None:
+            embeddings[: len(self._embeddings)] = self._embeddings
+            if scales is not None:
+                scales[: len(self._embedding_scales)] = self._embedding_scales
+        self._embeddings = embeddings
+        self._embedding_scales = scales
 
 
 class Tokenizer:
@@ -95,64 +275,54 @@ class Tokenizer:
         Returns a list of hashes corresponding to the tokens.
         """
         text = ensure_str(text)
-        sentence_tokens = re.split(r"(?<=[.!?]) +", text)  # Split text into sentences
         token_hashes = []
+        for sentence in _SENTENCE_RE.split(text):  # Split text into sentences
+            token_hashes.extend(self._tokenize_sentence(sentence))
+        return token_hashes
 
-        for sentence in sentence_tokens:
-            sentence_hash = self.global_dict.get_hash(sentence)
-            if sentence_hash in self.global_dict.phrase_store:
-                token_hashes.append(sentence_hash)
-            else:
-                # Break the sentence into phrases
-                phrases = re.split(r"[,;]", sentence)
-                phrase_hashes = []
-                for phrase in phrases:
-                    phrase_hash = self.global_dict.get_hash(phrase)
-                    if phrase_hash in self.global_dict.phrase_store:
-                        token_hashes.append(phrase_hash)
-                    else:
-                        phrase_hashes.append(phrase)
-
-                # Process remaining phrases
-                for phrase in phrase_hashes:
-                    # Break the phrase into words
-                    words = re.findall(r"\w+|[^\w\s]", phrase)
-                    word_hashes = []
-                    for word in words:
-                        word_hash = self.global_dict.get_hash(word)
-                        if word_hash in self.global_dict.word_store:
-                            token_hashes.append(word_hash)
-                        else:
-                            word_hashes.append(word)
-
-                    # Process remaining words
-                    for word in word_hashes:
-                        # Break the word into characters
-                        char_hashes = []
-                        for char in word:
-                            char_hash = self.global_dict.get_hash(char)
-                            if char_hash not in self.global_dict.char_store:
-                                self.global_dict.add_char(char)
-                            char_hashes.append(char_hash)
-                        # After processing the characters, add the word to the dictionary
-                        combined_word_hash = self.global_dict.get_hash(
-                            b"".join(char_hashes)
-                        )
-                        self.global_dict.add_word(word)
-                        token_hashes.append(combined_word_hash)
-
-                    # After processing the words, add the phrase to the dictionary
-                    combined_phrase_hash = self.global_dict.get_hash(
-                        b"".join(token_hashes[-len(words) :])
-                    )
-                    self.global_dict.add_phrase(phrase)
-                    token_hashes.append(combined_phrase_hash)
-
-                # After processing the phrases, add the sentence to the dictionary
-                combined_sentence_hash = self.global_dict.get_hash(
-                    b"".join(token_hashes[-len(phrases) :])
-                )
-                self.global_dict.add_phrase(sentence)
-                token_hashes.append(combined_sentence_hash)
+    def tokenize_and_embed_batch(
+        self, texts: list[str | bytes], n_workers: int | None = None
+    ) -> list[list[bytes]]:
+        """
+        Tokenize and embed several texts on a thread pool of n_workers threads,
+        one task per text.
+        Returns one list of hashes per text, as tokenize_and_embed would.
+        """
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            return list(executor.map(self.tokenize_and_embed, texts))
+
+    def _tokenize_sentence(self, sentence: str) -> list[bytes]:
+        """Tokenize and embed a single sentence and return its token hashes."""
+        # Bind the dictionary's methods once; the loops below run per phrase
+        # and word.
+        global_dict = self.global_dict
+        new_hash = global_dict._new_hash
+        intern_word = global_dict._intern_word
+        intern_phrase = global_dict._intern_phrase
+        token_hashes = []
+
+        # Hashes this sentence's phrase digests as they are produced
+        sentence_hasher = new_hash()
+        # Break the sentence into phrases
+        for phrase in _SUBPHRASE_RE.split(sentence):
+            # Hashes this phrase's word digests as they are produced
+            phrase_hasher = new_hash()
+            # Break the phrase into words; interning a word hashes and
+            # stores its characters along the way
+            for word in _TOKEN_RE.findall(phrase):
+                word_hash = intern_word(word)
+                token_hashes.append(word_hash)
+                phrase_hasher.update(word_hash)
+
+            # After processing the words, add the phrase to the dictionary
+            combined_phrase_hash = phrase_hasher.digest()
+            intern_phrase(phrase)
+            token_hashes.append(combined_phrase_hash)
+            sentence_hasher.update(combined_phrase_hash)
+
+        # After processing the phrases, add the sentence to the dictionary
+        combined_sentence_hash = sentence_hasher.digest()
+        intern_phrase(sentence)
+        token_hashes.append(combined_sentence_hash)
 
         return token_hashes
@@ -0,0 +1,256 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import bytedict.bytedict as bytedict_module
+from bytedict.bytedict import GlobalDictionary, Tokenizer
+
+
+def test_default_hash_algorithm_is_sha256():
+    gd = GlobalDictionary()
+    assert gd.add_char("a") == hashlib.sha256(b"a").digest()
+    assert gd.get_hash("hello") == hashlib.sha256(b"hello").digest()
+
+
+def test_blake3_hash_algorithm():
+    blake3 = pytest.importorskip("blake3")
+    gd = GlobalDictionary(hash_algorithm="blake3")
+    h = gd.add_word("hi")
+    expected = blake3.blake3(
+        blake3.blake3(b"h").digest() + blake3.blake3(b"i").digest()
+    ).digest()
+    assert h == expected
+    assert gd.get_word(h) == "hi"
+
+
+def test_unsupported_hash_algorithm_raises():
+    with pytest.raises(ValueError):
+        GlobalDictionary(hash_algorithm="md5")
+
+
+def test_blake3_without_package_raises_import_error(monkeypatch):
+    monkeypatch.setattr(bytedict_module, "_blake3", None)
+    monkeypatch.setattr(bytedict_module, "_HASHERS", {"sha256": hashlib.sha256})
+    with pytest.raises(ImportError, match="blake3 package"):
+        GlobalDictionary(hash_algorithm="blake3")
+
+
+def _sha(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def test_tokenize_sentence_hash_covers_its_phrase_hashes():
+    gd = GlobalDictionary()
+    hashes = Tokenizer(gd).tokenize_and_embed("a b, c.")
+    word_a, word_b, word_c, word_dot = (gd.add_word(w) for w in "abc.")
+    phrase_1 = _sha(word_a + word_b)
+    phrase_2 = _sha(word_c + word_dot)
+    assert hashes == [
+        word_a,
+        word_b,
+        phrase_1,
+        word_c,
+        word_dot,
+        phrase_2,
+        _sha(phrase_1 + phrase_2),
+    ]
+
+
+def test_tokenize_empty_phrase_hashes_empty_input():
+    gd = GlobalDictionary()
+    hashes = Tokenizer(gd).tokenize_and_embed("a,")
+    word_a = gd.add_word("a")
+    phrase_1 = _sha(word_a)
+    phrase_2 = _sha(b"")
+    assert hashes == [word_a, phrase_1, phrase_2, _sha(phrase_1 + phrase_2)]
+
+
+def test_colliding_word_and_phrase_keep_their_own_text():
+    gd = GlobalDictionary()
+    phrase_hash = gd.add_phrase(" !")
+    word_hash = gd.add_word("!")
+    assert word_hash == phrase_hash
+    assert gd.get_word(word_hash) == "!"
+    assert gd.get_phrase(phrase_hash) == " !"
+
+    gd = GlobalDictionary()
+    word_hash = gd.add_word("!")
+    phrase_hash = gd.add_phrase(" !")
+    assert gd.get_word(word_hash) == "!"
+    assert gd.get_phrase(phrase_hash) == " !"
+
+
+def test_get_returns_not_found_for_other_kinds():
+    gd = GlobalDictionary()
+    h = gd.add_word("hi")
+    assert gd.get_word(h) == "hi"
+    assert gd.get_char(h) == "Not found"
+    assert gd.get_phrase(h) == "Not found"
+    assert gd.get_word(b"\0" * 32) == "Not found"
+
+
+def test_tokenizer_punctuation_word_does_not_clobber_phrase():
+    gd = GlobalDictionary()
+    Tokenizer(gd).tokenize_and_embed("Hello; !")
+    h = gd.add_word("!")
+    assert gd.get_word(h) == "!"
+    assert gd.get_phrase(h) == " !"
+
+
+def test_embedding_round_trip():
+    gd = GlobalDictionary()
+    h = gd.add_word("hi")
+    assert gd.get_embedding(h).size == 0
+    gd.add_embedding(h, [0.5, -1.25, 3.0])
+    assert gd.get_embedding(h).tolist() == [0.5, -1.25, 3.0]
+    assert gd.get_word(h) == "hi"
+
+
+def test_embedding_survives_matrix_growth_and_is_a_copy():
+    gd = GlobalDictionary()
+    h = gd.add_word("hi")
+    gd.add_embedding(h, [1.0, 2.0])
+    embedding = gd.get_embedding(h)
+    embedding[0] = 99.0
+    for i in range(3000):
+        gd.add_embedding(gd.add_word(f"w{i}"), [i, -i])
+    assert gd.get_embedding(h).tolist() == [1.0, 2.0]
+    assert gd.get_embedding(gd.add_word("w2999")).tolist() == [2999.0, -2999.0]
+
+
+def test_embedding_dimension_mismatch_raises():
+    gd = GlobalDictionary()
+    gd.add_embedding(gd.add_word("a"), [1.0, 2.0])
+    with pytest.raises(ValueError):
+        gd.add_embedding(gd.add_word("b"), [1.0, 2.0, 3.0])
+    with pytest.raises(ValueError):
+        gd.add_embedding(gd.add_word("b"), [[1.0, 2.0]])
+
+
+@pytest.mark.parametrize("dtype", [np.int16, "bogus"])
+def test_unsupported_embedding_dtype_raises(dtype):
+    with pytest.raises(ValueError):
+        GlobalDictionary(embedding_dtype=dtype)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float16, "float16", np.int8])
+def test_supported_embedding_dtypes(dtype):
+    gd = GlobalDictionary(embedding_dtype=dtype)
+    h = gd.add_word("hi")
+    gd.add_embedding(h, [0.5, -1.25, 3.0])
+    np.testing.assert_allclose(gd.get_embedding(h), [0.5, -1.25, 3.0], atol=0.02)
+
+
+def test_int8_embedding_round_trip_tolerance():
+    gd = GlobalDictionary(embedding_dtype=np.int8)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 16)).astype(np.float32)
+    hashes = [gd.add_word(f"w{i}") for i in range(len(vectors))]
+    for h, vector in zip(hashes, vectors):
+        gd.add_embedding(h, vector)
+    for h, vector in zip(hashes, vectors):
+        restored = gd.get_embedding(h)
+        assert restored.dtype == np.float32
+        # Rounding to the nearest step is off by at most half a step
+        step = np.abs(vector).max() / 127
+        np.testing.assert_allclose(restored, vector, rtol=0, atol=step / 2 + 1e-6)
+
+
+def test_int8_zero_embedding():
+    gd = GlobalDictionary(embedding_dtype=np.int8)
+    h = gd.add_word("zero")
+    gd.add_embedding(h, [0.0, 0.0])
+    assert gd.get_embedding(h).tolist() == [0.0, 0.0]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float16, np.int8])
+@pytest.mark.parametrize("value", [np.inf, -np.inf, np.nan])
+def test_non_finite_embedding_raises(dtype, value):
+    gd = GlobalDictionary(embedding_dtype=dtype)
+    with pytest.raises(ValueError):
+        gd.add_embedding(gd.add_word("a"), [value, 1.0])
+
+
+def test_float16_embedding_out_of_range_raises():
+    gd = GlobalDictionary(embedding_dtype=np.float16)
+    h = gd.add_word("a")
+    with pytest.raises(ValueError):
+        gd.add_embedding(h, [1e6, 1.0])
+    gd.add_embedding(h, [60000.0, 1.0])
+    assert gd.get_embedding(h).tolist() == [60000.0, 1.0]
+
+
+_BATCH_TEXTS = [
+    "Hello, world! This is a test; of the tokenizer.  Again here.",
+    "héllo wörld, foo_bar! ¿Qué? a,,b;",
+    "",
+    "a,",
+    b"One. Two! Three? Four",
+] + [
+    f"Sentence {i} has words, like w{i % 7} and w{i % 11}. Then w{i}!"
+    for i in range(200)
+]
+
+
+def test_tokenize_and_embed_batch_matches_per_text_output():
+    expected = [
+        Tokenizer(GlobalDictionary()).tokenize_and_embed(text) for text in _BATCH_TEXTS
+    ]
+    per_text = Tokenizer(GlobalDictionary())
+    assert [per_text.tokenize_and_embed(t) for t in _BATCH_TEXTS] == expected
+    batch = Tokenizer(GlobalDictionary()).tokenize_and_embed_batch(
+        _BATCH_TEXTS, n_workers=8
+    )
+    assert batch == expected
+    assert Tokenizer(GlobalDictionary()).tokenize_and_embed_batch([]) == []
+
+
+def test_tokenize_and_embed_batch_stores_tokens():
+    gd = GlobalDictionary()
+    Tokenizer(gd).tokenize_and_embed_batch(_BATCH_TEXTS, n_workers=4)
+    assert gd.get_word(gd.add_word("Hello")) == "Hello"
+    assert gd.get_char(gd.add_char("é")) == "é"
+    assert gd.get_phrase(gd.add_phrase("Then w199!")) == "Then w199!"
+
+
+def test_lookups_during_batch_do_not_fail():
+    gd = GlobalDictionary()
+    words = [f"w{i}" for i in range(200)]
+    hashes = [GlobalDictionary().add_word(w) for w in words]
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                for h in hashes:
+                    gd.get_word(h)
+                    gd.get_embedding(h)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+                return
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        Tokenizer(gd).tokenize_and_embed_batch(_BATCH_TEXTS, n_workers=8)
+    finally:
+        stop.set()
+        reader.join()
+    assert errors == []
+
+
+def test_concurrent_add_embedding_keeps_every_row():
+    gd = GlobalDictionary()
+    hashes = [gd.add_word(f"w{i}") for i in range(4000)]
+
+    def add(i):
+        gd.add_embedding(hashes[i], [i, -i])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(add, range(len(hashes))))
+    for i, h in enumerate(hashes):
+        assert gd.get_embedding(h).tolist() == [i, -i]